@@ -20,6 +20,11 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.units import inch
 import hashlib
+import gzip
+import zlib
+import threading
+import time
+from embedding_index import EmbeddingIndex
 
 app = Flask(__name__)
 CORS(app)
@@ -29,9 +34,24 @@ FACES_DIR = 'student_faces'
 if not os.path.exists(FACES_DIR):
     os.makedirs(FACES_DIR)
 
+# Face embeddings shared with other instances via snapshots + change log
+EMBEDDINGS_DIR = 'embedding_index'
+
+# Audit logs older than the retention period are moved to monthly archives
+AUDIT_ARCHIVE_DIR = 'audit_archive'
+if not os.path.exists(AUDIT_ARCHIVE_DIR):
+    os.makedirs(AUDIT_ARCHIVE_DIR)
+AUDIT_RETENTION_DAYS = 90
+AUDIT_ARCHIVE_INTERVAL = 24 * 60 * 60  # seconds between archive runs
+AUDIT_ARCHIVE_RETRY = 60 * 60  # seconds before retrying a failed run
+
 # Simple auth (in production, use proper authentication)
 ADMIN_PASSWORD_HASH = hashlib.sha256("admin123".encode()).hexdigest()
 
+# Attendance bitmaps: one bit per day of the calendar year (term), per student
+TERM_DAYS = 366
+BITMAP_QUERY_CHUNK = 500
+
 # Initialize database with enhanced schema
 def init_db():
     conn = sqlite3.connect('attendance.db')
@@ -69,6 +89,19 @@ def init_db():
                   action TEXT NOT NULL,
                   details TEXT,
                   timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs (timestamp)')
+    
+    # Attendance bitmaps table (bit N set = present on day N of the term)
+    c.execute('''CREATE TABLE IF NOT EXISTS attendance_bitmaps
+                 (student_id TEXT NOT NULL,
+                  term TEXT NOT NULL,
+                  bits BLOB NOT NULL,
+                  PRIMARY KEY (student_id, term))''')
+    
+    # Backfill bitmaps for databases created before the table existed, and
+    # repair them if attendance was written without updating them
+    if not attendance_bitmaps_in_sync(c):
+        rebuild_attendance_bitmaps(c)
     
     # Insert default class
     c.execute("INSERT OR IGNORE INTO classes (class_name, description) VALUES ('Default', 'Default Class')")
@@ -76,6 +109,85 @@ def init_db():
     conn.commit()
     conn.close()
 
+def set_presence_bit(c, student_id, date_str):
+    """Set the bit for date_str (YYYY-MM-DD) in the student's term bitmap"""
+    day = datetime.strptime(date_str, '%Y-%m-%d')
+    term = str(day.year)
+    offset = day.timetuple().tm_yday - 1
+    
+    c.execute('SELECT bits FROM attendance_bitmaps WHERE student_id = ? AND term = ?', (student_id, term))
+    row = c.fetchone()
+    bits = bytearray(row[0]) if row else bytearray((TERM_DAYS + 7) // 8)
+    bits[offset >> 3] |= 0x80 >> (offset & 7)
+    c.execute('INSERT OR REPLACE INTO attendance_bitmaps (student_id, term, bits) VALUES (?, ?, ?)',
+              (student_id, term, bytes(bits)))
+
+def mark_presence(c, attendance_id):
+    """Update the bitmap for a freshly inserted attendance row"""
+    c.execute('SELECT student_id, DATE(timestamp) FROM attendance WHERE id = ?', (attendance_id,))
+    student_id, date_str = c.fetchone()
+    set_presence_bit(c, student_id, date_str)
+
+def rebuild_attendance_bitmaps(c):
+    """Rebuild all attendance bitmaps from the attendance table"""
+    c.execute('DELETE FROM attendance_bitmaps')
+    c.execute('SELECT DISTINCT student_id, DATE(timestamp) FROM attendance')
+    for student_id, date_str in c.fetchall():
+        set_presence_bit(c, student_id, date_str)
+
+def attendance_bitmaps_in_sync(c):
+    """Check that the bitmaps hold one set bit per distinct (student, day) of attendance"""
+    c.execute('SELECT COUNT(*) FROM (SELECT DISTINCT student_id, DATE(timestamp) FROM attendance)')
+    expected = c.fetchone()[0]
+    c.execute('SELECT bits FROM attendance_bitmaps')
+    bits = b''.join(row[0] for row in c.fetchall())
+    return int(np.unpackbits(np.frombuffer(bits, dtype=np.uint8)).sum()) == expected
+
+def load_presence(c, student_ids, start_date, end_date):
+    """Return a (students x days) boolean presence matrix for the date range"""
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    total_days = max((end - start).days + 1, 0)
+    presence = np.zeros((len(student_ids), total_days), dtype=bool)
+    if total_days == 0 or not student_ids:
+        return presence
+    
+    rows = {sid: i for i, sid in enumerate(student_ids)}
+    bitmaps = []
+    # Only decode the requested students' bitmaps, in chunks below SQLite's variable limit
+    for i in range(0, len(student_ids), BITMAP_QUERY_CHUNK):
+        chunk = student_ids[i:i + BITMAP_QUERY_CHUNK]
+        c.execute(f'''SELECT student_id, term, bits FROM attendance_bitmaps
+                      WHERE term BETWEEN ? AND ? AND student_id IN ({', '.join('?' * len(chunk))})''',
+                  (str(start.year), str(end.year), *chunk))
+        bitmaps.extend(c.fetchall())
+    
+    for student_id, term, bits in bitmaps:
+        term_start = datetime(int(term), 1, 1)
+        term_length = (datetime(int(term) + 1, 1, 1) - term_start).days
+        # Slice of this term that falls inside [start, end]
+        lo = max((start - term_start).days, 0)
+        hi = min((end - term_start).days + 1, term_length)
+        if lo >= hi:
+            continue
+        days = np.unpackbits(np.frombuffer(bits, dtype=np.uint8))[lo:hi]
+        col = (term_start - start).days + lo
+        presence[rows[student_id], col:col + len(days)] = days
+    
+    return presence
+
+def longest_streaks(presence):
+    """Longest run of consecutive present days for each row of a presence matrix"""
+    n, days = presence.shape
+    padded = np.zeros((n, days + 2), dtype=np.int8)
+    padded[:, 1:-1] = presence
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    streaks = np.zeros(n, dtype=np.int64)
+    np.maximum.at(streaks, start_rows, ends - starts)
+    return streaks
+
 init_db()
 
 def log_action(action, details=""):
@@ -86,6 +198,97 @@ def log_action(action, details=""):
     conn.commit()
     conn.close()
 
+def audit_archive_path(month, run_id):
+    """Archive file written by one archive run for a month (YYYY-MM)"""
+    return os.path.join(AUDIT_ARCHIVE_DIR, f'audit_logs_{month}.{run_id}.jsonl.gz')
+
+def archive_audit_logs(retention_days=AUDIT_RETENTION_DAYS):
+    """Move audit logs older than retention_days into monthly gzip JSONL archives"""
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    conn = sqlite3.connect('attendance.db')
+    c = conn.cursor()
+    try:
+        # Take the write lock up front so concurrent archivers don't copy the same rows
+        c.execute('BEGIN IMMEDIATE')
+        c.execute('SELECT id, action, details, timestamp FROM audit_logs WHERE timestamp < ? ORDER BY id', (cutoff,))
+        logs = c.fetchall()
+        
+        if not logs:
+            return 0
+        
+        by_month = {}
+        for log in logs:
+            by_month.setdefault(log[3][:7], []).append(log)
+        
+        # Each run writes its own files and renames them into place, so a run that
+        # dies mid-write never leaves a partial file behind. Rows are written before
+        # they are deleted, so a failed commit can leave copies in the archive;
+        # read_archived_audit_logs skips repeated ids
+        run_id = f'{logs[0][0]}-{logs[-1][0]}'
+        for month, rows in by_month.items():
+            fd, tmp_path = tempfile.mkstemp(dir=AUDIT_ARCHIVE_DIR, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                    for log_id, action, details, timestamp in rows:
+                        f.write(json.dumps({'id': log_id, 'action': action, 'details': details,
+                                            'timestamp': timestamp}) + '\n')
+                os.replace(tmp_path, audit_archive_path(month, run_id))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        
+        c.execute('DELETE FROM audit_logs WHERE timestamp < ? AND id <= ?', (cutoff, logs[-1][0]))
+        conn.commit()
+        
+        return len(logs)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+def audit_archive_worker():
+    """Archive old audit logs periodically, off the request path"""
+    while True:
+        try:
+            archive_audit_logs()
+            delay = AUDIT_ARCHIVE_INTERVAL
+        except Exception:
+            app.logger.exception('Audit log archiving failed')
+            delay = AUDIT_ARCHIVE_RETRY
+        time.sleep(delay)
+
+threading.Thread(target=audit_archive_worker, daemon=True).start()
+
+def read_archived_audit_logs(start_date=None, end_date=None):
+    """Read archived audit logs whose date falls within [start_date, end_date]"""
+    logs = []
+    seen_ids = set()
+    for filename in sorted(os.listdir(AUDIT_ARCHIVE_DIR)):
+        if not (filename.startswith('audit_logs_') and filename.endswith('.jsonl.gz')):
+            continue
+        month = filename[len('audit_logs_'):][:7]
+        if (start_date and month < start_date[:7]) or (end_date and month > end_date[:7]):
+            continue
+        
+        try:
+            with gzip.open(os.path.join(AUDIT_ARCHIVE_DIR, filename), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    log = json.loads(line)
+                    day = log['timestamp'][:10]
+                    if (start_date and day < start_date) or (end_date and day > end_date):
+                        continue
+                    if log['id'] in seen_ids:
+                        continue
+                    seen_ids.add(log['id'])
+                    logs.append(log)
+        except (OSError, EOFError, zlib.error, ValueError, KeyError):
+            # Keep serving the other archives; rows read before the damage are kept
+            app.logger.exception(f'Unreadable audit archive {filename}')
+    
+    return logs
+
 def save_image_from_base64(image_data, filename):
     """Save base64 image to file"""
     image_bytes = base64.b64decode(image_data)
@@ -105,6 +308,39 @@ def image_to_temp_file(image_data):
     cv2.imwrite(temp_file.name, image)
     return temp_file.name
 
+def face_embedding(image_path):
+    """Compute the VGG-Face embedding of the face in an image"""
+    result = DeepFace.represent(image_path, model_name='VGG-Face', detector_backend='opencv',
+                                enforce_detection=False)
+    return result[0]['embedding']
+
+# Same cutoff DeepFace.verify applies for VGG-Face with cosine distance
+try:
+    from deepface.modules.verification import find_threshold
+    MATCH_THRESHOLD = find_threshold('VGG-Face', 'cosine')
+except ImportError:
+    from deepface.commons.distance import findThreshold
+    MATCH_THRESHOLD = findThreshold('VGG-Face', 'cosine')
+
+def load_student_embeddings():
+    """Embed every stored student photo (only used to seed an empty index)"""
+    conn = sqlite3.connect('attendance.db')
+    c = conn.cursor()
+    c.execute("SELECT student_id, name, class_section, image_path FROM students WHERE image_path != ''")
+    students = c.fetchall()
+    conn.close()
+    
+    for student_id, name, class_section, image_path in students:
+        if not os.path.exists(image_path):
+            continue
+        try:
+            yield student_id, name, class_section, face_embedding(image_path)
+        except Exception:
+            continue
+
+embedding_index = EmbeddingIndex(EMBEDDINGS_DIR)
+embedding_index.bootstrap(load_student_embeddings)
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """Simple authentication"""
@@ -146,6 +382,12 @@ def register_student():
             os.unlink(temp_path)
             return jsonify({'error': f'Face detection failed: {str(e)}'}), 400
         
+        try:
+            embedding = face_embedding(temp_path)
+        except Exception as e:
+            os.unlink(temp_path)
+            return jsonify({'error': f'Face embedding failed: {str(e)}'}), 400
+        
         # Save image permanently
         filename = f"{student_id}.jpg"
         filepath = save_image_from_base64(image_data, filename)
@@ -157,6 +399,18 @@ def register_student():
         c.execute('INSERT INTO students (name, student_id, email, class_section, image_path) VALUES (?, ?, ?, ?, ?)',
                   (name, student_id, email, class_section, filepath))
         conn.commit()
+        
+        # Undo the registration if the shared index can't take it, so the
+        # student can be registered again instead of never being recognized
+        try:
+            embedding_index.register(student_id, name, class_section, embedding)
+        except Exception:
+            c.execute('DELETE FROM students WHERE student_id = ?', (student_id,))
+            conn.commit()
+            conn.close()
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
         conn.close()
         
         log_action('REGISTER_STUDENT', f'Student {name} ({student_id}) registered')
@@ -223,43 +477,41 @@ def recognize_face():
         
         conn = sqlite3.connect('attendance.db')
         c = conn.cursor()
-        c.execute('SELECT student_id, name, image_path FROM students WHERE class_section = ?', (class_section,))
-        students = c.fetchall()
+        c.execute('SELECT COUNT(*) FROM students WHERE class_section = ?', (class_section,))
         
-        if len(students) == 0:
+        if c.fetchone()[0] == 0:
             conn.close()
             os.unlink(temp_path)
             return jsonify({'error': 'No students registered in this class'}), 400
         
         recognized = []
         
-        for student_id, name, stored_image_path in students:
-            try:
-                result = DeepFace.verify(
-                    temp_path, 
-                    stored_image_path,
-                    model_name='VGG-Face',
-                    detector_backend='opencv',
-                    enforce_detection=False
-                )
-                
-                if result['verified']:
-                    c.execute('INSERT INTO attendance (student_id, marked_by, class_section) VALUES (?, ?, ?)', 
-                             (student_id, 'auto', class_section))
-                    conn.commit()
-                    
-                    confidence = 1 - result['distance']
-                    recognized.append({
-                        'student_id': student_id,
-                        'name': name,
-                        'confidence': float(confidence)
-                    })
-                    
-                    log_action('MARK_ATTENDANCE', f'Auto: {name} ({student_id})')
-                    break
-                    
-            except Exception as e:
-                continue
+        try:
+            embedding = face_embedding(temp_path)
+        except Exception as e:
+            conn.close()
+            os.unlink(temp_path)
+            return jsonify({'error': f'Face embedding failed: {str(e)}'}), 400
+        
+        # Pick up registrations and deletions made on other instances
+        embedding_index.sync()
+        match = embedding_index.match(embedding, class_section, MATCH_THRESHOLD)
+        
+        if match:
+            student_id, name, distance = match
+            c.execute('INSERT INTO attendance (student_id, marked_by, class_section) VALUES (?, ?, ?)', 
+                     (student_id, 'auto', class_section))
+            mark_presence(c, c.lastrowid)
+            conn.commit()
+            
+            confidence = 1 - distance
+            recognized.append({
+                'student_id': student_id,
+                'name': name,
+                'confidence': float(confidence)
+            })
+            
+            log_action('MARK_ATTENDANCE', f'Auto: {name} ({student_id})')
         
         conn.close()
         os.unlink(temp_path)
@@ -295,6 +547,7 @@ def mark_manual_attendance():
         
         c.execute('INSERT INTO attendance (student_id, marked_by, class_section) VALUES (?, ?, ?)',
                   (student_id, 'manual', class_section))
+        mark_presence(c, c.lastrowid)
         conn.commit()
         conn.close()
         
@@ -304,6 +557,22 @@ def mark_manual_attendance():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/attendance/bitmaps/rebuild', methods=['POST'])
+def rebuild_bitmaps():
+    """Rebuild the attendance bitmaps from the attendance table"""
+    try:
+        conn = sqlite3.connect('attendance.db')
+        c = conn.cursor()
+        rebuild_attendance_bitmaps(c)
+        conn.commit()
+        conn.close()
+        
+        log_action('REBUILD_BITMAPS', 'Attendance bitmaps rebuilt')
+        
+        return jsonify({'message': 'Attendance bitmaps rebuilt'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students', methods=['GET'])
 def get_students():
     class_section = request.args.get('class_section', None)
@@ -348,8 +617,11 @@ def delete_student(student_id):
             
             c.execute('DELETE FROM students WHERE student_id = ?', (student_id,))
             c.execute('DELETE FROM attendance WHERE student_id = ?', (student_id,))
+            c.execute('DELETE FROM attendance_bitmaps WHERE student_id = ?', (student_id,))
             conn.commit()
             
+            embedding_index.delete(student_id)
+            
             log_action('DELETE_STUDENT', f'{name} ({student_id})')
         
         conn.close()
@@ -399,37 +671,29 @@ def get_attendance_range():
     c = conn.cursor()
     
     if class_section:
-        c.execute('''SELECT s.student_id, s.name, COUNT(DISTINCT DATE(a.timestamp)) as days_present
-                     FROM students s
-                     LEFT JOIN attendance a ON s.student_id = a.student_id 
-                     AND DATE(a.timestamp) BETWEEN ? AND ?
-                     WHERE s.class_section = ?
-                     GROUP BY s.student_id, s.name
-                     ORDER BY s.name''', (start_date, end_date, class_section))
+        c.execute('''SELECT student_id, name FROM students
+                     WHERE class_section = ?
+                     ORDER BY name''', (class_section,))
     else:
-        c.execute('''SELECT s.student_id, s.name, COUNT(DISTINCT DATE(a.timestamp)) as days_present
-                     FROM students s
-                     LEFT JOIN attendance a ON s.student_id = a.student_id 
-                     AND DATE(a.timestamp) BETWEEN ? AND ?
-                     GROUP BY s.student_id, s.name
-                     ORDER BY s.name''', (start_date, end_date))
+        c.execute('SELECT student_id, name FROM students ORDER BY name')
     
-    records = c.fetchall()
+    students = c.fetchall()
+    presence = load_presence(c, [s[0] for s in students], start_date, end_date)
     conn.close()
     
-    # Calculate total days
-    start = datetime.strptime(start_date, '%Y-%m-%d')
-    end = datetime.strptime(end_date, '%Y-%m-%d')
-    total_days = (end - start).days + 1
+    total_days = presence.shape[1]
+    days_present = presence.sum(axis=1).tolist()
+    streaks = longest_streaks(presence).tolist()
     
     return jsonify({
         'records': [{
-            'student_id': r[0],
-            'name': r[1],
-            'days_present': r[2],
+            'student_id': s[0],
+            'name': s[1],
+            'days_present': days_present[i],
             'total_days': total_days,
-            'percentage': round((r[2] / total_days * 100), 2) if total_days > 0 else 0
-        } for r in records],
+            'percentage': round((days_present[i] / total_days * 100), 2) if total_days > 0 else 0,
+            'longest_streak': streaks[i]
+        } for i, s in enumerate(students)],
         'total_days': total_days
     })
 
@@ -494,19 +758,12 @@ def get_dashboard_analytics():
     
     # Absent today
     if class_section:
-        c.execute('''SELECT s.student_id, s.name
-                     FROM students s
-                     WHERE s.class_section = ? AND s.student_id NOT IN (
-                         SELECT student_id FROM attendance WHERE DATE(timestamp) = ?
-                     )''', (class_section, today))
+        c.execute('SELECT student_id, name FROM students WHERE class_section = ?', (class_section,))
     else:
-        c.execute('''SELECT s.student_id, s.name
-                     FROM students s
-                     WHERE s.student_id NOT IN (
-                         SELECT student_id FROM attendance WHERE DATE(timestamp) = ?
-                     )''', (today,))
-    
-    absent_today = c.fetchall()
+        c.execute('SELECT student_id, name FROM students')
+    students = c.fetchall()
+    present_today = load_presence(c, [s[0] for s in students], today, today)[:, 0]
+    absent_today = [s for s, present in zip(students, present_today) if not present]
     
     conn.close()
     
@@ -572,28 +829,18 @@ def export_pdf():
     c = conn.cursor()
     
     if class_section != 'All':
-        c.execute('''SELECT s.student_id, s.name, COUNT(DISTINCT DATE(a.timestamp)) as days_present
-                     FROM students s
-                     LEFT JOIN attendance a ON s.student_id = a.student_id
-                     AND DATE(a.timestamp) BETWEEN ? AND ?
-                     WHERE s.class_section = ?
-                     GROUP BY s.student_id, s.name
-                     ORDER BY s.name''', (start_date, end_date, class_section))
+        c.execute('''SELECT student_id, name FROM students
+                     WHERE class_section = ?
+                     ORDER BY name''', (class_section,))
     else:
-        c.execute('''SELECT s.student_id, s.name, COUNT(DISTINCT DATE(a.timestamp)) as days_present
-                     FROM students s
-                     LEFT JOIN attendance a ON s.student_id = a.student_id
-                     AND DATE(a.timestamp) BETWEEN ? AND ?
-                     GROUP BY s.student_id, s.name
-                     ORDER BY s.name''', (start_date, end_date))
+        c.execute('SELECT student_id, name FROM students ORDER BY name')
     
-    records = c.fetchall()
+    students = c.fetchall()
+    presence = load_presence(c, [s[0] for s in students], start_date, end_date)
     conn.close()
     
-    # Calculate total days
-    start = datetime.strptime(start_date, '%Y-%m-%d')
-    end = datetime.strptime(end_date, '%Y-%m-%d')
-    total_days = (end - start).days + 1
+    total_days = presence.shape[1]
+    records = [(s[0], s[1], present) for s, present in zip(students, presence.sum(axis=1).tolist())]
     
     # Create PDF
     buffer = BytesIO()
@@ -689,20 +936,57 @@ def create_class():
 
 @app.route('/api/audit-logs', methods=['GET'])
 def get_audit_logs():
-    """Get audit logs"""
+    """Get audit logs, optionally within a date range (including archived logs)"""
     limit = int(request.args.get('limit', 50))
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
     
     conn = sqlite3.connect('attendance.db')
     c = conn.cursor()
-    c.execute('SELECT action, details, timestamp FROM audit_logs ORDER BY timestamp DESC LIMIT ?', (limit,))
-    logs = c.fetchall()
-    conn.close()
-    
-    return jsonify([{
+    if start_date or end_date:
+        c.execute('''SELECT action, details, timestamp FROM audit_logs
+                     WHERE timestamp >= ? AND timestamp <= ?
+                     ORDER BY timestamp DESC LIMIT ?''',
+                  (start_date or '0000-01-01', f'{end_date or "9999-12-31"} 23:59:59', limit))
+    else:
+        c.execute('SELECT action, details, timestamp FROM audit_logs ORDER BY timestamp DESC LIMIT ?', (limit,))
+    logs = [{
         'action': l[0],
         'details': l[1],
         'timestamp': l[2]
-    } for l in logs])
+    } for l in c.fetchall()]
+    conn.close()
+    
+    # Archived logs are all older than the hot table, so only read them to fill up the page
+    if (start_date or end_date) and len(logs) < limit:
+        archived = read_archived_audit_logs(start_date, end_date)
+        archived.sort(key=lambda l: l['timestamp'], reverse=True)
+        logs.extend({
+            'action': l['action'],
+            'details': l['details'],
+            'timestamp': l['timestamp']
+        } for l in archived[:limit - len(logs)])
+    
+    return jsonify(logs)
+
+@app.route('/api/audit-logs/archive', methods=['POST'])
+def archive_audit_logs_now():
+    """Archive audit logs older than the retention period"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            retention_days = int(data.get('retention_days', AUDIT_RETENTION_DAYS))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'retention_days must be an integer'}), 400
+        if retention_days < 1:
+            return jsonify({'error': 'retention_days must be at least 1'}), 400
+        
+        archived = archive_audit_logs(retention_days)
+        log_action('ARCHIVE_AUDIT_LOGS', f'{archived} audit logs older than {retention_days} days archived')
+        
+        return jsonify({'archived': archived})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""Face embedding index shared by several app instances on one volume.
+
+The index directory holds:
+    snapshot_<seq>.npz   the full index as of change number <seq>
+    changes_<seq>.jsonl  log segment of register/delete events after <seq>
+    index.lock           lock file serialising writers
+
+Each instance loads the latest snapshot at boot and then tails the log
+segment that snapshot starts, so registrations and deletions made on one
+node reach every other node without restarts or re-reading student
+photos. Every snapshot starts a new segment; segments older than the
+snapshots that are kept are deleted.
+"""
+import os
+import json
+import base64
+import fcntl
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def encode_embedding(embedding):
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode('ascii')
+
+
+def decode_embedding(data):
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class EmbeddingIndex:
+    def __init__(self, directory, snapshot_every=100):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.lock_path = os.path.join(directory, 'index.lock')
+        # Guards in-memory state between request threads; locked() guards the files
+        self._mutex = threading.RLock()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.load()
+
+    @contextmanager
+    def locked(self):
+        """Hold the exclusive writer lock shared by all instances"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self):
+        """Load the latest snapshot, then apply newer changes from the log"""
+        with self._mutex:
+            self.students = {}  # student_id -> (name, class_section, embedding)
+            self.seq = 0
+
+            # Older snapshots may be pruned by another node while we look at them
+            for path in reversed(self._snapshot_paths()):
+                try:
+                    with np.load(path) as data:
+                        for student_id, name, class_section, embedding in zip(
+                                data['student_ids'], data['names'], data['class_sections'], data['embeddings']):
+                            self.students[str(student_id)] = (str(name), str(class_section), embedding)
+                        self.seq = int(data['seq'])
+                    break
+                except FileNotFoundError:
+                    continue
+
+            self.segment = self.seq
+            self.offset = 0
+            self.sync()
+
+    def sync(self):
+        """Apply change log entries written since the last sync, return how many"""
+        with self._mutex:
+            applied = 0
+            while True:
+                # List segments before reading: once a newer segment exists,
+                # nothing more is appended to the current one
+                later = [seq for seq in self._segment_seqs() if seq > self.segment]
+                path = self._segment_path(self.segment)
+
+                start = self.offset
+                try:
+                    with open(path, 'rb') as f:
+                        f.seek(start)
+                        data = f.read()
+                except FileNotFoundError:
+                    if self.segment < self._latest_snapshot_seq():
+                        # Our segment was pruned; catch up from the newest snapshot
+                        self.load()
+                        return applied
+                    data = b''
+                # Only consume complete lines; a writer may be midway through one
+                end = data.rfind(b'\n') + 1
+                data = data[:end]
+                self.offset = start + end
+
+                for line in data.splitlines():
+                    applied += self._apply(line)
+
+                if not later:
+                    return applied
+                self.segment = later[0]
+                self.offset = 0
+
+    def register(self, student_id, name, class_section, embedding):
+        """Add or replace a student's embedding on every node"""
+        with self.locked():
+            self._append({'op': 'register', 'student_id': student_id, 'name': name,
+                          'class_section': class_section, 'embedding': encode_embedding(embedding)})
+            self._maybe_snapshot()
+
+    def delete(self, student_id):
+        """Remove a student's embedding on every node"""
+        with self.locked():
+            self._append({'op': 'delete', 'student_id': student_id})
+            self._maybe_snapshot()
+
+    def bootstrap(self, load_entries):
+        """Fill an empty shared index from load_entries() unless a node already has.
+
+        load_entries yields (student_id, name, class_section, embedding) tuples
+        and is only called by the first node to boot against an empty directory.
+        """
+        with self.locked():
+            self.sync()
+            if self.seq > 0:
+                return False
+            for student_id, name, class_section, embedding in load_entries():
+                self._append({'op': 'register', 'student_id': student_id, 'name': name,
+                              'class_section': class_section, 'embedding': encode_embedding(embedding)})
+            self.snapshot()
+        return True
+
+    def snapshot(self):
+        """Write a snapshot of the current index and start a new log segment (caller holds the lock)"""
+        with self._mutex:
+            self.sync()
+            student_ids = list(self.students)
+            entries = [self.students[sid] for sid in student_ids]
+            if entries:
+                embeddings = np.stack([e[2] for e in entries]).astype(np.float32)
+            else:
+                embeddings = np.zeros((0, 0), dtype=np.float32)
+
+            # Create the segment first so a snapshot never points at a missing one
+            open(self._segment_path(self.seq), 'a').close()
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f,
+                         student_ids=np.array(student_ids, dtype=str),
+                         names=np.array([e[0] for e in entries], dtype=str),
+                         class_sections=np.array([e[1] for e in entries], dtype=str),
+                         embeddings=embeddings,
+                         seq=self.seq)
+            os.replace(tmp_path, os.path.join(self.directory, f'snapshot_{self.seq:012d}.npz'))
+
+            # Keep the previous snapshot and its segments for nodes loading it right now
+            snapshots = self._snapshot_paths()
+            for path in snapshots[:-2]:
+                os.remove(path)
+            oldest_kept = self._seq_from_name(os.path.basename(snapshots[-2:][0]))
+            for seq in self._segment_seqs():
+                if seq < oldest_kept:
+                    os.remove(self._segment_path(seq))
+
+    def match(self, embedding, class_section, threshold):
+        """Closest student in class_section by cosine distance, or None if above threshold"""
+        with self._mutex:
+            candidates = [(sid, e) for sid, e in self.students.items() if e[1] == class_section]
+        if not candidates:
+            return None
+
+        stored = np.stack([e[2] for _, e in candidates])
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = 1 - stored @ query / (np.linalg.norm(stored, axis=1) * np.linalg.norm(query))
+        best = int(np.argmin(distances))
+        if distances[best] > threshold:
+            return None
+
+        student_id, (name, _, _) = candidates[best]
+        return student_id, name, float(distances[best])
+
+    def _apply(self, line):
+        """Apply one log line, return 1 if it changed the index"""
+        try:
+            event = json.loads(line)
+            if event['seq'] <= self.seq:
+                return 0
+            if event['op'] == 'register':
+                self.students[event['student_id']] = (
+                    event['name'], event['class_section'], decode_embedding(event['embedding']))
+            elif event['op'] == 'delete':
+                self.students.pop(event['student_id'], None)
+        except (ValueError, KeyError, TypeError):
+            # Remains of a writer that died mid-line
+            return 0
+        self.seq = event['seq']
+        return 1
+
+    def _append(self, event):
+        """Append an event to the change log and apply it (caller holds the lock)"""
+        with self._mutex:
+            self.sync()
+            event['seq'] = self.seq + 1
+            with open(self._segment_path(self.segment), 'ab+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    # Don't glue our event onto a partial line left by a dead writer
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                f.write((json.dumps(event) + '\n').encode('utf-8'))
+            self.sync()
+
+    def _maybe_snapshot(self):
+        if self.seq - self._latest_snapshot_seq() >= self.snapshot_every:
+            self.snapshot()
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f'changes_{seq:012d}.jsonl')
+
+    def _segment_seqs(self):
+        return sorted(self._seq_from_name(name) for name in os.listdir(self.directory)
+                      if name.startswith('changes_') and name.endswith('.jsonl'))
+
+    def _snapshot_paths(self):
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith('snapshot_') and name.endswith('.npz'))
+
+    def _latest_snapshot_seq(self):
+        snapshots = self._snapshot_paths()
+        return self._seq_from_name(os.path.basename(snapshots[-1])) if snapshots else 0
+
+    @staticmethod
+    def _seq_from_name(name):
+        return int(name.split('_', 1)[1].split('.', 1)[0])
@@ -0,0 +1,145 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+app = None
+
+
+def setUpModule():
+    # app.py keeps its database and data directories in the working directory
+    global app, _cwd, _tmp
+    _tmp = tempfile.TemporaryDirectory()
+    _cwd = os.getcwd()
+    os.chdir(_tmp.name)
+    import app as app_module
+    app = app_module
+    # app may already have been imported by another test module in a different directory
+    app.init_db()
+
+
+def tearDownModule():
+    os.chdir(_cwd)
+    _tmp.cleanup()
+
+
+def random_day(rng):
+    return date(2023, 1, 1) + timedelta(days=rng.randrange((date(2025, 12, 31) - date(2023, 1, 1)).days + 1))
+
+
+class AttendanceBitmapTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.c = self.conn.cursor()
+        self.c.execute('''CREATE TABLE attendance
+                          (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                           student_id TEXT NOT NULL,
+                           timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        self.c.execute('''CREATE TABLE attendance_bitmaps
+                          (student_id TEXT NOT NULL,
+                           term TEXT NOT NULL,
+                           bits BLOB NOT NULL,
+                           PRIMARY KEY (student_id, term))''')
+
+    def tearDown(self):
+        self.conn.close()
+
+    def mark(self, student_id, day, time='09:00:00'):
+        self.c.execute('INSERT INTO attendance (student_id, timestamp) VALUES (?, ?)',
+                       (student_id, f'{day.isoformat()} {time}'))
+        app.mark_presence(self.c, self.c.lastrowid)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(26)
+        students = [f's{i}' for i in range(12)]
+        present = set()
+        for _ in range(1500):
+            student_id, day = rng.choice(students), random_day(rng)
+            self.mark(student_id, day, f'{rng.randrange(24):02d}:00:00')
+            present.add((student_id, day))
+
+        ranges = [(date(2023, 12, 25), date(2024, 1, 5)),
+                  (date(2024, 2, 27), date(2024, 3, 2)),
+                  (date(2024, 12, 30), date(2025, 1, 1)),
+                  (date(2023, 1, 1), date(2025, 12, 31))]
+        for _ in range(40):
+            a, b = random_day(rng), random_day(rng)
+            ranges.append((min(a, b), max(a, b)))
+
+        for start, end in ranges:
+            days = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+            expected = np.array([[(sid, d) in present for d in days] for sid in students])
+            presence = app.load_presence(self.c, students, start.isoformat(), end.isoformat())
+            np.testing.assert_array_equal(presence, expected, err_msg=f'{start} to {end}')
+
+            streaks = []
+            for row in expected:
+                best = run = 0
+                for is_present in row:
+                    run = run + 1 if is_present else 0
+                    best = max(best, run)
+                streaks.append(best)
+            self.assertEqual(app.longest_streaks(presence).tolist(), streaks)
+
+    def test_only_requested_students_and_chunking(self):
+        self.mark('a', date(2024, 2, 29))
+        self.mark('b', date(2024, 2, 29))
+        presence = app.load_presence(self.c, ['b', 'missing'], '2024-02-29', '2024-02-29')
+        self.assertEqual(presence.tolist(), [[True], [False]])
+
+        many = [f'x{i}' for i in range(app.BITMAP_QUERY_CHUNK * 2 + 5)] + ['a']
+        presence = app.load_presence(self.c, many, '2024-02-29', '2024-02-29')
+        self.assertEqual(int(presence.sum()), 1)
+        self.assertTrue(presence[-1, 0])
+
+    def test_empty_and_reversed_ranges(self):
+        self.mark('a', date(2024, 1, 1))
+        self.assertEqual(app.load_presence(self.c, ['a'], '2024-01-02', '2024-01-01').shape, (1, 0))
+        self.assertEqual(app.load_presence(self.c, [], '2024-01-01', '2024-01-02').shape, (0, 2))
+        self.assertEqual(app.longest_streaks(np.zeros((2, 0), dtype=bool)).tolist(), [0, 0])
+
+    def test_rebuild_matches_incremental_and_repairs_drift(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            self.mark(rng.choice('abcde'), random_day(rng))
+        self.c.execute('SELECT student_id, term, bits FROM attendance_bitmaps ORDER BY student_id, term')
+        incremental = self.c.fetchall()
+        self.assertTrue(app.attendance_bitmaps_in_sync(self.c))
+
+        # Attendance written without touching the bitmaps, e.g. by an older node
+        self.c.execute("INSERT INTO attendance (student_id, timestamp) VALUES ('f', '2024-06-01 10:00:00')")
+        self.assertFalse(app.attendance_bitmaps_in_sync(self.c))
+
+        app.rebuild_attendance_bitmaps(self.c)
+        self.assertTrue(app.attendance_bitmaps_in_sync(self.c))
+        self.c.execute("SELECT student_id, term, bits FROM attendance_bitmaps WHERE student_id != 'f' "
+                       "ORDER BY student_id, term")
+        self.assertEqual(self.c.fetchall(), incremental)
+        self.assertTrue(app.load_presence(self.c, ['f'], '2024-06-01', '2024-06-01')[0, 0])
+
+
+class RebuildRouteTest(unittest.TestCase):
+    def test_rebuild_route_repairs_range_report(self):
+        conn = sqlite3.connect('attendance.db')
+        conn.execute("INSERT INTO students (name, student_id, class_section, image_path) "
+                     "VALUES ('Ada', 'r1', 'Rebuild', '')")
+        conn.executemany('INSERT INTO attendance (student_id, timestamp, class_section) VALUES (?, ?, ?)',
+                         [('r1', '2024-12-31 08:00:00', 'Rebuild'), ('r1', '2025-01-01 08:00:00', 'Rebuild')])
+        conn.commit()
+        conn.close()
+
+        client = app.app.test_client()
+        query = '/api/attendance/range?start_date=2024-12-30&end_date=2025-01-02&class_section=Rebuild'
+        self.assertEqual(client.get(query).get_json()['records'][0]['days_present'], 0)
+
+        self.assertEqual(client.post('/api/attendance/bitmaps/rebuild').status_code, 200)
+        record = client.get(query).get_json()['records'][0]
+        self.assertEqual((record['days_present'], record['longest_streak'], record['total_days']), (2, 2, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
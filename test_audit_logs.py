@@ -0,0 +1,140 @@
+import os
+import gzip
+import json
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+app = None
+
+
+def setUpModule():
+    # app.py keeps its database and data directories in the working directory
+    global app, _cwd, _tmp
+    _tmp = tempfile.TemporaryDirectory()
+    _cwd = os.getcwd()
+    os.chdir(_tmp.name)
+    import app as app_module
+    app = app_module
+    # app may already have been imported by another test module in a different directory
+    app.init_db()
+
+
+def tearDownModule():
+    os.chdir(_cwd)
+    _tmp.cleanup()
+
+
+def days_ago(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class AuditLogArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(app, 'AUDIT_ARCHIVE_DIR', self.archive_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.archive_dir.cleanup)
+
+        self.conn = sqlite3.connect('attendance.db')
+        self.conn.execute('DELETE FROM audit_logs')
+        self.conn.commit()
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def insert(self, details, days):
+        cursor = self.conn.execute('INSERT INTO audit_logs (action, details, timestamp) VALUES (?, ?, ?)',
+                                   ('TEST', details, days_ago(days)))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def hot_details(self):
+        return [r[0] for r in self.conn.execute('SELECT details FROM audit_logs ORDER BY id')]
+
+    def ranged(self, limit=50, start_days=400, end_days=0):
+        start = days_ago(start_days)[:10]
+        end = days_ago(end_days)[:10]
+        response = self.client.get(f'/api/audit-logs?start_date={start}&end_date={end}&limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        return [l['details'] for l in response.get_json()]
+
+    def test_archive_round_trip(self):
+        for days in (300, 200, 120, 10, 1):
+            self.insert(str(days), days)
+
+        self.assertEqual(app.archive_audit_logs(90), 3)
+        self.assertEqual(self.hot_details(), ['10', '1'])
+        self.assertEqual(app.archive_audit_logs(90), 0)
+        self.assertEqual(self.ranged(), ['1', '10', '120', '200', '300'])
+        self.assertEqual(self.ranged(start_days=250, end_days=150), ['200'])
+
+    def test_archived_rows_only_fill_up_the_page(self):
+        for days in (300, 200, 120, 10, 1):
+            self.insert(str(days), days)
+        app.archive_audit_logs(90)
+
+        self.assertEqual(self.ranged(limit=2), ['1', '10'])
+        self.assertEqual(self.ranged(limit=4), ['1', '10', '120', '200'])
+
+    def test_rows_left_by_failed_commit_are_not_duplicated(self):
+        log_id = self.insert('old', 200)
+        app.archive_audit_logs(90)
+        # The same row still in the hot table, as if the DELETE had been rolled back
+        self.conn.execute('INSERT INTO audit_logs (id, action, details, timestamp) VALUES (?, ?, ?, ?)',
+                          (log_id, 'TEST', 'old', days_ago(200)))
+        self.conn.commit()
+        self.insert('newer', 150)
+        app.archive_audit_logs(90)
+
+        # Both runs' files hold the row
+        copies = 0
+        for filename in os.listdir(self.archive_dir.name):
+            with gzip.open(os.path.join(self.archive_dir.name, filename), 'rt') as f:
+                copies += sum(json.loads(line)['id'] == log_id for line in f)
+        self.assertEqual(copies, 2)
+        self.assertEqual(self.ranged(), ['newer', 'old'])
+
+    def test_failed_write_leaves_no_partial_archive(self):
+        self.insert('a', 200)
+        self.insert('b', 200)
+        with mock.patch.object(app.json, 'dumps', side_effect=[json.dumps({}), OSError('disk full')]):
+            with self.assertRaises(OSError):
+                app.archive_audit_logs(90)
+
+        self.assertEqual(os.listdir(self.archive_dir.name), [])
+        self.assertEqual(self.hot_details(), ['a', 'b'])
+        self.assertEqual(app.archive_audit_logs(90), 2)
+        self.assertEqual(sorted(self.ranged()), ['a', 'b'])
+
+    def test_corrupt_archive_is_skipped(self):
+        self.insert('good', 200)
+        app.archive_audit_logs(90)
+        # A full member, half a member and another full member fail the CRC check
+        member = gzip.compress(json.dumps({'id': 999, 'action': 'TEST', 'details': 'bad',
+                                           'timestamp': days_ago(200)}).encode() + b'\n')
+        month = days_ago(200)[:7]
+        with open(os.path.join(self.archive_dir.name, f'audit_logs_{month}.broken.jsonl.gz'), 'wb') as f:
+            f.write(member + member[:len(member) // 2] + member)
+
+        with self.assertLogs(app.app.logger, 'ERROR'):
+            details = self.ranged()
+        self.assertIn('good', details)
+
+    def test_archive_endpoint_validates_retention_days(self):
+        for retention_days in ('abc', None, -5, 0):
+            response = self.client.post('/api/audit-logs/archive', json={'retention_days': retention_days})
+            self.assertEqual(response.status_code, 400, retention_days)
+
+        self.insert('old', 200)
+        response = self.client.post('/api/audit-logs/archive', json={'retention_days': 90})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'archived': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import threading
+import unittest
+import multiprocessing
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex
+
+
+def register_and_delete(directory, worker, count):
+    """Register `count` students, deleting every third one again"""
+    index = EmbeddingIndex(directory, snapshot_every=7)
+    for i in range(count):
+        index.register(f's{worker}_{i}', f'Student {worker}-{i}', 'A', np.random.rand(8))
+        if i % 3 == 0:
+            index.delete(f's{worker}_{i}')
+
+
+def expected_students(workers, count):
+    return {f's{w}_{i}' for w in range(workers) for i in range(count) if i % 3 != 0}
+
+
+class EmbeddingIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'index')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_processes_converge(self):
+        tailing = EmbeddingIndex(self.directory)
+        workers = [multiprocessing.Process(target=register_and_delete, args=(self.directory, w, 30))
+                   for w in range(4)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        tailing.sync()
+        cold = EmbeddingIndex(self.directory)
+        self.assertEqual(set(tailing.students), expected_students(4, 30))
+        self.assertEqual(set(cold.students), set(tailing.students))
+        self.assertEqual(cold.seq, tailing.seq)
+
+    def test_log_is_rotated_on_snapshot(self):
+        register_and_delete(self.directory, 0, 60)
+        names = os.listdir(self.directory)
+        self.assertLessEqual(len([n for n in names if n.startswith('snapshot_')]), 2)
+        self.assertLessEqual(len([n for n in names if n.startswith('changes_')]), 3)
+        self.assertEqual(set(EmbeddingIndex(self.directory).students), expected_students(1, 60))
+
+    def test_lagging_node_catches_up_after_pruning(self):
+        lagging = EmbeddingIndex(self.directory)
+        register_and_delete(self.directory, 0, 60)
+        lagging.sync()
+        self.assertEqual(set(lagging.students), expected_students(1, 60))
+
+    def test_partial_line_is_skipped(self):
+        writer = EmbeddingIndex(self.directory)
+        writer.register('a', 'A', 'A', np.ones(8))
+        with open(writer._segment_path(writer.segment), 'ab') as f:
+            f.write(b'{"op": "register", "stud')
+        writer.register('b', 'B', 'A', np.ones(8))
+
+        reader = EmbeddingIndex(self.directory)
+        self.assertEqual(set(reader.students), {'a', 'b'})
+
+    def test_concurrent_sync_from_threads(self):
+        reader = EmbeddingIndex(self.directory)
+        writer = EmbeddingIndex(self.directory, snapshot_every=1000)
+        for i in range(50):
+            writer.register(f's{i}', f'Student {i}', 'A', np.random.rand(8))
+
+        threads = [threading.Thread(target=reader.sync) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(reader.offset, os.path.getsize(reader._segment_path(reader.segment)))
+
+        writer.register('late', 'Late', 'A', np.random.rand(8))
+        reader.sync()
+        self.assertEqual(len(reader.students), 51)
+
+    def test_match(self):
+        index = EmbeddingIndex(self.directory)
+        index.register('a', 'Alice', 'A', [1, 0, 0])
+        index.register('b', 'Bob', 'A', [0, 1, 0])
+        index.register('c', 'Carol', 'B', [1, 0, 0])
+
+        student_id, name, distance = index.match([0.9, 0.1, 0], 'A', 0.4)
+        self.assertEqual((student_id, name), ('a', 'Alice'))
+        self.assertLess(distance, 0.4)
+        self.assertIsNone(index.match([0, 0, 1], 'A', 0.4))
+        self.assertIsNone(index.match([1, 0, 0], 'C', 0.4))
+
+
+if __name__ == '__main__':
+    unittest.main()